@@ -1,229 +1,28 @@
 # --- 0. IMPORTS ---
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import TypedDict, Annotated
-from langgraph.graph import StateGraph, START, END
-from langgraph.graph.message import add_messages
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, BaseMessage
-from langchain_openai import ChatOpenAI
-from langchain_core.tools import tool
-from langchain_community.tools import DuckDuckGoSearchRun, WikipediaQueryRun
-from langchain_community.utilities import WikipediaAPIWrapper
-import os
-from dotenv import load_dotenv, dotenv_values
-# SqliteSaver may not exist in all langgraph releases/installs. Import defensively.
-try:
-    from langgraph.checkpoint.sqlite import SqliteSaver
-except Exception:
-    SqliteSaver = None
-import sqlite3
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from types import MappingProxyType
+from langchain_core.messages import HumanMessage, AIMessage
+import json
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import uvicorn
-import requests
-import traceback
-
-# -------------------------------------------------------
-# SETUP & LLM CONFIGURATION
-# -------------------------------------------------------
-
-load_dotenv()
-env_values = dotenv_values()
-
-# Ensure API Key is available
-api_key = env_values.get("OPENROUTER_API_KEY") or env_values.get("OPENAI_API_KEY")
-if not api_key:
-    api_key = os.environ.get("OPENROUTER_API_KEY") or os.environ.get("OPENAI_API_KEY")
-if not api_key:
-    raise RuntimeError("No API key found.")
-
-os.environ["LANGCHAIN_TRACING_V2"] = "true"
-
-# --- 1. TOOLS DEFINITION ---
-
-# 🔍 DuckDuckGo Search Tool
-ddg_search = DuckDuckGoSearchRun()
-
-# 📚 Wikipedia Tool
-wiki_tool = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
-
-# 🧮 Calculator Tool
-@tool
-def calculator_tool(first_num: float, second_num: float, operation: str) -> dict:
-    """Perform a basic arithmetic operation on two numbers. Supported operations: add, sub, mul, div"""
-    try:
-        op_map = {"add": "+", "sub": "-", "mul": "*", "div": "/"}
-        if operation not in op_map:
-            return {"error": f"Unsupported operation '{operation}'"}
-        if operation == "div" and second_num == 0:
-            return {"error": "Division by zero is not allowed"}
-        
-        # Using eval here for simple calculation is acceptable for internal tools
-        result = eval(f"{first_num} {op_map[operation]} {second_num}")
-        return {"first_num": first_num, "second_num": second_num, "operation": operation, "result": result}
-    except Exception as e:
-        return {"error": str(e)}
-
-# 📈 Stock Price Tool
-@tool
-def stock_tool(symbol: str):
-    """Fetch latest stock price for a given symbol (e.g. 'AAPL', 'TSLA') using Alpha Vantage."""
-    # NOTE: Using a public/placeholder key. This tool is highly prone to rate-limiting errors.
-    url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey=3DDZ72FTDBKOTKX9"
-    try:
-        r = requests.get(url)
-        r.raise_for_status() 
-        data = r.json()
-        
-        if "Error Message" in data:
-            return f"Alpha Vantage Error: {data['Error Message']}"
-        if "Note" in data and "limit" in data["Note"].lower():
-            return f"Alpha Vantage Rate Limit Exceeded: {data['Note']}"
-        
-        if "Global Quote" in data and data["Global Quote"]:
-            quote = data["Global Quote"]
-            if '05. price' in quote:
-                return {"symbol": symbol, "price": quote['05. price']}
-            
-        return f"Could not find stock quote for {symbol}. API response: {data}"
-    
-    except Exception as e:
-        return f"Stock Tool Runtime Error: {str(e)}"
-
-
-# --- LLM with Tool Binding ---
-llm = ChatOpenAI(
-    model="google/gemini-2.0-flash-001",
-    openai_api_base="https://openrouter.ai/api/v1",
-    openai_api_key=api_key,
-    timeout=20,
-    max_retries=2
-).bind_tools([
-    ddg_search,
-    wiki_tool,
-    calculator_tool, 
-    stock_tool,
-])
-
-
-# --- 2. STATE ---
-class ChatState(TypedDict):
-    messages: Annotated[list[BaseMessage], add_messages]
-
-
-# --- 3. CHAT NODE (The Router) ---
-async def chat_node(state: ChatState):
-    """Invokes the LLM to decide on the next action (respond or call tool)."""
-    try:
-        # Use ainvoke for async compatibility with FastAPI
-        response = await llm.ainvoke(state["messages"])
-        return {"messages": [response]}
-    except Exception as e:
-        print(f"LLM ERROR: {e}")
-        return {"messages": [AIMessage(content=f"Error communicating with LLM: {str(e)}")]}
-
-
-# --- 4. TOOL NODE (The Executor) ---
-def tool_node(state: ChatState):
-    """Executes any tool calls requested by the LLM."""
-    last_msg = state["messages"][-1]
-    
-    if not hasattr(last_msg, "tool_calls") or not last_msg.tool_calls:
-        # Should not happen in a correctly routed graph, but good for safety
-        return {"messages": [AIMessage(content="No tool call detected")]}
-
-    outputs = []
-    
-    # Map tool names (as used by the LLM) to the actual tool objects
-    tool_map = {
-        "duckduckgo_search": ddg_search,
-        "wikipedia": wiki_tool,
-        "calculator_tool": calculator_tool, 
-        "stock_tool": stock_tool,           
-    }
-    
-    for call in last_msg.tool_calls:
-        name = call["name"]
-        args = call["args"]
-        tool_call_id = call["id"]
-        
-        print(f"[TOOL] Calling {name} with arguments: {args}")
-
-        try:
-            tool_to_call = tool_map.get(name)
-
-            if not tool_to_call:
-                out = f"Unknown tool: {name}. Available tools: {list(tool_map.keys())}"
-            
-            # Handling for single-input runnables (DuckDuckGo, Wikipedia)
-            elif name in ["duckduckgo_search", "wikipedia"]:
-                query = args.get('query') or args.get('input') or list(args.values())[0]
-                out = tool_to_call.invoke(query)
-            
-            # Handling for custom @tool functions (Calculator, Stock)
-            elif name in ["calculator_tool", "stock_tool"]:
-                out = tool_to_call.invoke(args) 
-            
-            else:
-                 out = f"Tool '{name}' not mapped correctly."
-
-        except Exception as e:
-            tb = traceback.format_exc()
-            print(f"[TOOL ERROR] {name} raised {type(e).__name__}: {e}\n{tb}")
-            out = f"Tool '{name}' failed: {type(e).__name__}: {e}"
-
-        if not isinstance(out, str):
-            out = str(out)
-
-        # Package the result into a ToolMessage for the LLM
-        outputs.append(
-            ToolMessage(
-                content=out,
-                tool_call_id=tool_call_id,
-                name=name
-            )
-        )
-
-    return {"messages": outputs}
-
-
-conn = sqlite3.connect(database="chatbot5.db", check_same_thread=False)
-if SqliteSaver is not None:
-    try:
-        checkpointer = SqliteSaver(conn=conn)
-    except Exception as e:
-        print(f"Warning: SqliteSaver import succeeded but initialization failed: {e}")
-        checkpointer = None
-else:
-    print("Warning: langgraph.checkpoint.sqlite.SqliteSaver not available. Continuing without persistent checkpointer.")
-    checkpointer = None
-
-
-# --- 5. GRAPH DEFINITION ---
-graph = StateGraph(ChatState)
-graph.add_node("chat", chat_node)
-graph.add_node("tool", tool_node)
-
-# Entry point
-graph.add_edge(START, "chat")
-
-# Conditional Edge: Decide whether to go to the tool or end
-graph.add_conditional_edges(
-    "chat",
-    # Check if the last message has tool calls
-    lambda state: "tool" if hasattr(state["messages"][-1], "tool_calls") and state["messages"][-1].tool_calls else END,
-    {
-        "tool": "tool",
-        END: END
-    }
-)
+# Works both as `backend.api` (package import) and `api` (run from inside backend/)
+try:
+    from .graph import start_agent, close_agent
+except ImportError:
+    from graph import start_agent, close_agent
 
-# Tool execution always loops back to the chat node for synthesis
-graph.add_edge("tool", "chat")
+# Compiled agent graph; set on app startup (see graph.get_chatbot)
+chatbot = None
 
-if checkpointer is not None:
-    chatbot = graph.compile(checkpointer=checkpointer)
-else:
-    chatbot = graph.compile()
+# Threads for sync tools (DuckDuckGo, Wikipedia, calculator) run via ainvoke. Sized
+# explicitly so each Gunicorn worker doesn't default to min(32, cores + 4) threads.
+EXECUTOR_WORKERS = 8
 
 
 # -------------------------------------------------------
@@ -233,54 +32,115 @@ else:
 app = FastAPI(title="LangGraph Tool Agent API")
 
 # CORS Configuration
+# Origins must match the browser's Origin header exactly (scheme + host, no trailing slash)
+ALLOWED_ORIGINS = [
+    "http://localhost:5173",
+    "http://127.0.0.1:5173",
+    # Add your vercel app domain here
+    "https://ai-chatbot-ioo5-hcwa63db1-praharsh-singhs-projects.vercel.app",
+]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",
-        "http://127.0.0.1:5173",
-        # Add your vercel app domain here
-        "https://ai-chatbot-ioo5-hcwa63db1-praharsh-singhs-projects.vercel.app/", 
-    ],
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Streamed responses that must not be gzipped: zlib holds output until it fills a block,
+# which would buffer SSE token deltas (older Starlette releases don't exclude event streams)
+_UNCOMPRESSED_PATHS = {"/chat/stream"}
+
+
+class GZipExceptStreamsMiddleware:
+    """GZipMiddleware for every route except the streaming ones in _UNCOMPRESSED_PATHS."""
+
+    def __init__(self, app, minimum_size: int = 500):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in _UNCOMPRESSED_PATHS:
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+
+# Compress text responses (long LLM replies); tiny payloads like /ping aren't worth it
+app.add_middleware(GZipExceptStreamsMiddleware, minimum_size=512)
+
 
 class ChatInput(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     user_message: str
     thread_id: str
 
 class ChatResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     response_content: str
     thread_id: str
 
 
+# Run config shared by every request (read-only); only the thread_id is overlaid per call
+_BASE_CFG = MappingProxyType({
+    "run_name": "tool-agent-run",
+    "metadata": {"user": "frontend"}
+})
+
+
+# In-flight /chat runs keyed by (thread_id, sha1(user_message))
+_inflight: dict[str, asyncio.Future] = {}
+
+
+async def _run_chat(input_data: ChatInput) -> str:
+    """Runs one user message through the agent graph and returns the final reply text."""
+    human_message = HumanMessage(content=input_data.user_message)
+    
+    # Define config for memory persistence via thread_id
+    # IMPORTANT: LangGraph uses the thread_id for checkpointing (memory)
+    config = {**_BASE_CFG, "configurable": {"thread_id": input_data.thread_id}}
+    
+    # Await the async invocation of the compiled graph
+    response_state = await chatbot.ainvoke(
+        {"messages": [human_message]},
+        config=config
+    )
+    
+    # Extract the final AIMessage content
+    return response_state["messages"][-1].content
+
+
 # --- 6. CHAT ENDPOINT ---
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(input_data: ChatInput):
     """Processes user message through the LangGraph agent."""
     
-    human_message = HumanMessage(content=input_data.user_message)
-    
-    # Define config for memory persistence via thread_id
-    config = {
-        # IMPORTANT: LangGraph uses the thread_id for checkpointing (memory)
-        "configurable": {"thread_id": input_data.thread_id}, 
-        "run_name": "tool-agent-run",
-        "metadata": {"user": "frontend"}
-    }
+    # Single-flight: an identical message for the same thread that is already being
+    # processed (retry, double-click) shares that run's result instead of starting another
+    key = f"{input_data.thread_id}:{hashlib.sha1(input_data.user_message.encode()).hexdigest()}"
     
     try:
-        # Await the async invocation of the compiled graph
-        response_state = await chatbot.ainvoke(
-            {"messages": [human_message]},
-            config=config
-        )
-        
-        # Extract the final AIMessage content
-        final_message = response_state["messages"][-1]
-        final_response = final_message.content
+        if key in _inflight:
+            final_response = await asyncio.shield(_inflight[key])
+        else:
+            future = asyncio.get_running_loop().create_future()
+            # Mark any exception as retrieved so runs without duplicates don't log "never retrieved"
+            future.add_done_callback(lambda f: f.exception())
+            _inflight[key] = future
+            try:
+                final_response = await _run_chat(input_data)
+                future.set_result(final_response)
+            except Exception as e:
+                future.set_exception(e)
+                raise
+            finally:
+                _inflight.pop(key, None)
+                if not future.done():
+                    # This run was cancelled (client went away); release any duplicates waiting on it
+                    future.set_exception(RuntimeError("original request was cancelled"))
 
     except Exception as e:
         print(f"API Invocation Error: {e}")
@@ -292,12 +152,61 @@ async def chat_endpoint(input_data: ChatInput):
         thread_id=input_data.thread_id
     )
 
+# --- 6b. STREAMING CHAT ENDPOINT (Server-Sent Events) ---
+@app.post("/chat/stream")
+async def chat_stream_endpoint(input_data: ChatInput):
+    """Same as /chat, but streams the LLM's tokens back as SSE `data:` events while they are generated."""
+    
+    human_message = HumanMessage(content=input_data.user_message)
+    config = {**_BASE_CFG, "configurable": {"thread_id": input_data.thread_id}}
+
+    async def event_stream():
+        try:
+            # stream_mode="messages" yields (message_chunk, metadata) pairs as the LLM decodes
+            async for chunk, metadata in chatbot.astream(
+                {"messages": [human_message]},
+                config=config,
+                stream_mode="messages"
+            ):
+                # Forward AI text only: token deltas from the chat node, or the direct reply
+                # tool_node emits for calculator/stock results (tool outputs are skipped)
+                if isinstance(chunk, AIMessage) and metadata.get("langgraph_node") in ("chat", "tool") and chunk.content:
+                    yield f"data: {json.dumps({'delta': chunk.content})}\n\n"
+        except Exception as e:
+            print(f"API Streaming Error: {e}")
+            yield f"data: {json.dumps({'error': f'Agent runtime error: {str(e)}'})}\n\n"
+        yield f"data: {json.dumps({'done': True, 'thread_id': input_data.thread_id})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering (nginx) so events reach the client immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# --- Lifecycle ---
+@app.on_event("startup")
+async def startup():
+    global chatbot
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS))
+    chatbot = await start_agent()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_agent()
+
+
 # --- Utility Endpoint ---
 @app.get("/ping")
 def ping():
     return {"message": "pong"}
 
 # --- 7. RUN ---
+# Production runs multiple workers under Gunicorn (see start.sh / gunicorn.conf.py).
+# This block is a single-process fallback for local development.
 if __name__ == "__main__":
-    # Ensure uvicorn is installed (pip install uvicorn)
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Ensure uvicorn is installed (pip install "uvicorn[standard]")
+    # "auto" selects uvloop/httptools when installed (uvloop is unavailable on Windows)
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto", http="auto")
\ No newline at end of file
@@ -0,0 +1,500 @@
+# -------------------------------------------------------
+# LANGGRAPH AGENT
+# -------------------------------------------------------
+# Tools, LLM binding, nodes and graph wiring for the tool agent served by api.py
+# (and the chatbot.py CLI).
+# The graph is compiled lazily, once per start_agent(), through get_chatbot().
+
+from functools import lru_cache
+from typing import TypedDict, Annotated
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, BaseMessage, SystemMessage
+from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
+from langchain_community.tools import DuckDuckGoSearchRun, WikipediaQueryRun
+from langchain_community.utilities import WikipediaAPIWrapper
+import os
+import re
+import asyncio
+import operator
+from dotenv import load_dotenv
+# AsyncSqliteSaver (langgraph-checkpoint-sqlite + aiosqlite) may not exist in all installs. Import defensively.
+try:
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+except Exception:
+    aiosqlite = None
+    AsyncSqliteSaver = None
+import httpx
+import traceback
+from cachetools import TTLCache
+# Works both as `backend.graph` (package import) and `graph` (run from inside backend/)
+try:
+    from .llm import get_llm, aclose_llm
+except ImportError:
+    from llm import get_llm, aclose_llm
+
+# -------------------------------------------------------
+# SETUP
+# -------------------------------------------------------
+
+load_dotenv()
+
+os.environ["LANGCHAIN_TRACING_V2"] = "true"
+
+# Shared async HTTP client for tools (connection pooling + timeouts).
+# Created on first use and dropped by close_agent(), so a later startup gets a fresh one.
+_http = None
+
+
+def _get_http() -> httpx.AsyncClient:
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+        )
+    return _http
+
+# --- 1. TOOLS DEFINITION ---
+
+# 🔍 DuckDuckGo Search Tool
+ddg_search = DuckDuckGoSearchRun()
+
+# 📚 Wikipedia Tool
+wiki_tool = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+
+# 🧮 Calculator Tool
+# operation -> (symbol used when echoing the result, implementation)
+_OPS = {
+    "add": ("+", operator.add),
+    "sub": ("-", operator.sub),
+    "mul": ("*", operator.mul),
+    "div": ("/", operator.truediv),
+}
+
+@tool
+def calculator_tool(first_num: float, second_num: float, operation: str) -> dict:
+    """Perform a basic arithmetic operation on two numbers. Supported operations: add, sub, mul, div"""
+    try:
+        if operation not in _OPS:
+            return {"error": f"Unsupported operation '{operation}'"}
+        if operation == "div" and second_num == 0:
+            return {"error": "Division by zero is not allowed"}
+        
+        result = _OPS[operation][1](first_num, second_num)
+        return {"first_num": first_num, "second_num": second_num, "operation": operation, "result": result}
+    except Exception as e:
+        return {"error": str(e)}
+
+# 📈 Stock Price Tool
+@tool
+async def stock_tool(symbol: str):
+    """Fetch latest stock price for a given symbol (e.g. 'AAPL', 'TSLA') using Alpha Vantage."""
+    # NOTE: Using a public/placeholder key. This tool is highly prone to rate-limiting errors.
+    url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey=3DDZ72FTDBKOTKX9"
+    try:
+        r = await _get_http().get(url)
+        r.raise_for_status() 
+        data = r.json()
+        
+        if "Error Message" in data:
+            return f"Alpha Vantage Error: {data['Error Message']}"
+        if "Note" in data and "limit" in data["Note"].lower():
+            return f"Alpha Vantage Rate Limit Exceeded: {data['Note']}"
+        
+        if "Global Quote" in data and data["Global Quote"]:
+            quote = data["Global Quote"]
+            if '05. price' in quote:
+                return {"symbol": symbol, "price": quote['05. price']}
+            
+        return f"Could not find stock quote for {symbol}. API response: {data}"
+    
+    except Exception as e:
+        return f"Stock Tool Runtime Error: {str(e)}"
+
+
+# --- LLM with Tool Binding ---
+_TOOLS = [
+    ddg_search,
+    wiki_tool,
+    calculator_tool, 
+    stock_tool,
+]
+
+# Bound to the shared, pooled HTTP/2 client from llm.py. Rebound after close_agent(),
+# because that closes the client this binding holds.
+_bound_llm = None
+
+
+def get_bound_llm():
+    """Returns the shared LLM with the agent's tools bound (raises if no API key is configured)."""
+    global _bound_llm
+    if _bound_llm is None:
+        _bound_llm = get_llm().bind_tools(_TOOLS)
+    return _bound_llm
+
+
+# --- System Prompt ---
+# Kept byte-identical across every request and always sent first (right after the tool
+# schemas), so the stable prefix can be served from the provider's prompt/prefix cache
+# and only the volatile conversation suffix is prefilled on each turn.
+SYSTEM_PROMPT = SystemMessage(content=(
+    "You are a helpful assistant. Use the available tools (web search, Wikipedia, "
+    "calculator, stock prices) when they help answer the user's question, "
+    "and answer directly otherwise."
+))
+
+
+# --- 2. STATE ---
+class ChatState(TypedDict):
+    messages: Annotated[list[BaseMessage], add_messages]
+    # Set by tool_node when the tool results already answer the question (skip LLM synthesis)
+    tools_answered: bool
+
+
+# --- 3. CHAT NODE (The Router) ---
+async def chat_node(state: ChatState, config: RunnableConfig):
+    """Invokes the LLM to decide on the next action (respond or call tool)."""
+    try:
+        # Use ainvoke for async compatibility with FastAPI.
+        # The system prompt is prepended here (not stored in the checkpoint) so it stays the
+        # first message of every request regardless of thread history.
+        # Passing the node's config keeps tracing and /chat/stream token callbacks attached.
+        response = await get_bound_llm().ainvoke([SYSTEM_PROMPT, *state["messages"]], config)
+        return {"messages": [response]}
+    except Exception as e:
+        print(f"LLM ERROR: {e}")
+        return {"messages": [AIMessage(content=f"Error communicating with LLM: {str(e)}")]}
+
+
+# --- 4. TOOL NODE (The Executor) ---
+
+# Map tool names (as used by the LLM) to the actual tool objects
+_TOOL_MAP = {
+    "duckduckgo_search": ddg_search,
+    "wikipedia": wiki_tool,
+    "calculator_tool": calculator_tool, 
+    "stock_tool": stock_tool,           
+}
+
+# How each tool is invoked:
+#   "query" - single-input runnables (DuckDuckGo, Wikipedia) take the raw query string
+#   "args"  - custom @tool functions (Calculator, Stock) take the whole args dict
+_TOOL_STYLE = {
+    "duckduckgo_search": "query",
+    "wikipedia": "query",
+    "calculator_tool": "args",
+    "stock_tool": "args",
+}
+
+# Short-lived cache for search tools: repeated queries skip the network and avoid DDG rate limits
+_search_cache = TTLCache(maxsize=2048, ttl=600)
+# Cache misses currently being fetched; concurrent identical queries await the same upstream call
+_search_inflight: dict[tuple, asyncio.Future] = {}
+
+DDG_MAX_RETRIES = 3
+DDG_BACKOFF_BASE = 0.5  # seconds; doubled on each retry
+
+
+async def _search(name: str, tool_to_call, query: str):
+    """Invokes a search tool through the TTL cache, backing off when DuckDuckGo rate-limits us."""
+    key = (name, query.strip().lower())
+    if key in _search_cache:
+        return _search_cache[key]
+    if key in _search_inflight:
+        return await asyncio.shield(_search_inflight[key])
+
+    future = asyncio.get_running_loop().create_future()
+    # Mark any exception as retrieved so misses without duplicates don't log "never retrieved"
+    future.add_done_callback(lambda f: f.exception())
+    _search_inflight[key] = future
+    try:
+        out = await _fetch_with_backoff(name, tool_to_call, query)
+        _search_cache[key] = out
+        future.set_result(out)
+        return out
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        _search_inflight.pop(key, None)
+        if not future.done():
+            # This call was cancelled; release any duplicates waiting on it
+            future.set_exception(RuntimeError(f"{name} lookup was cancelled"))
+
+
+async def _fetch_with_backoff(name: str, tool_to_call, query: str):
+    for attempt in range(DDG_MAX_RETRIES + 1):
+        try:
+            return await tool_to_call.ainvoke(query)
+        except Exception as e:
+            is_rate_limit = "ratelimit" in f"{type(e).__name__} {e}".lower().replace(" ", "")
+            if name != "duckduckgo_search" or not is_rate_limit or attempt == DDG_MAX_RETRIES:
+                raise
+            delay = DDG_BACKOFF_BASE * (2 ** attempt)
+            print(f"[TOOL] {name} rate-limited, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def _dispatch(call: dict) -> tuple[ToolMessage, object]:
+    """Runs a single tool call; returns its ToolMessage plus the raw (un-stringified) tool result."""
+    name = call["name"]
+    args = call["args"]
+    tool_call_id = call["id"]
+    
+    print(f"[TOOL] Calling {name} with arguments: {args}")
+
+    try:
+        tool_to_call = _TOOL_MAP.get(name)
+        style = _TOOL_STYLE.get(name)
+
+        if not tool_to_call:
+            out = f"Unknown tool: {name}. Available tools: {list(_TOOL_MAP.keys())}"
+        
+        elif style == "query":
+            query = args.get('query') or args.get('input') or list(args.values())[0]
+            out = await _search(name, tool_to_call, query)
+        
+        elif style == "args":
+            out = await tool_to_call.ainvoke(args) 
+        
+        else:
+             out = f"Tool '{name}' not mapped correctly."
+
+    except Exception as e:
+        tb = traceback.format_exc()
+        print(f"[TOOL ERROR] {name} raised {type(e).__name__}: {e}\n{tb}")
+        out = f"Tool '{name}' failed: {type(e).__name__}: {e}"
+
+    raw = out
+    if not isinstance(out, str):
+        out = str(out)
+
+    # Package the result into a ToolMessage for the LLM
+    return ToolMessage(
+        content=out,
+        tool_call_id=tool_call_id,
+        name=name
+    ), raw
+
+
+# Tools whose successful output is already a complete answer, so no LLM synthesis is needed
+_TERMINAL_TOOLS = {"calculator_tool", "stock_tool"}
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _fmt_number(value):
+    # Tool args arrive as floats; show 2.0 as 2
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+# Words a bare lookup/expression may contain besides its numbers, operator and ticker.
+# Anything else ("prime", "binary", "CEO", "should I buy") means the prompt asks for more
+# than the tool output, so the LLM has to synthesize the reply.
+_WORD_RE = re.compile(r"[a-z]+|[^\sa-z]")
+_FILLER_WORDS = {
+    "what", "whats", "s", "is", "the", "of", "how", "much", "please", "tell", "me",
+    "calculate", "compute", "get", "show", "give", "'", "\u2019", "?", "!", ".", "=",
+}
+_CALC_WORDS = {
+    "+", "-", "*", "/", "x", "\u00d7", "\u00f7", "(", ")",
+    "plus", "add", "added", "to", "and", "sum", "minus", "subtract", "subtracted", "from",
+    "times", "multiplied", "multiply", "by", "product", "divided", "divide", "over",
+}
+_STOCK_WORDS = {
+    "price", "stock", "share", "shares", "quote", "current", "latest", "today", "now",
+    "for", "trading", "at", "$",
+}
+
+
+def _maps_trivially(name: str, args: dict, prompt: str) -> bool:
+    """True when the user's message is a bare expression/lookup fully answered by this one call."""
+    text = prompt.lower()
+    numbers = [float(n) for n in _NUMBER_RE.findall(text)]
+    words = set(_WORD_RE.findall(_NUMBER_RE.sub(" ", text)))
+    if name == "calculator_tool":
+        operands = {float(args.get("first_num", "nan")), float(args.get("second_num", "nan"))}
+        return all(n in operands for n in numbers) and words <= _FILLER_WORDS | _CALC_WORDS
+    # e.g. "AAPL price times 10" still needs the LLM (and a calculator call) afterwards
+    ticker = str(args.get("symbol", "")).lower()
+    return not numbers and words <= _FILLER_WORDS | _STOCK_WORDS | {ticker}
+
+
+def _terminal_answer(name: str, raw):
+    """Formats a terminal tool's successful result as the final reply, or returns None if it can't."""
+    # Both tools return a dict on success; errors come back as strings or {"error": ...}
+    if name not in _TERMINAL_TOOLS or not isinstance(raw, dict) or "error" in raw:
+        return None
+    if name == "calculator_tool":
+        symbol = _OPS[raw["operation"]][0]
+        return f"{_fmt_number(raw['first_num'])} {symbol} {_fmt_number(raw['second_num'])} = {_fmt_number(raw['result'])}"
+    return f"The latest price of {raw['symbol']} is {raw['price']}."
+
+
+def _can_short_circuit(messages: list, last_msg) -> bool:
+    """Only a turn's first hop, with one silent terminal call that covers the whole prompt, skips synthesis."""
+    calls = last_msg.tool_calls
+    if len(calls) != 1 or calls[0]["name"] not in _TERMINAL_TOOLS or last_msg.content:
+        return False
+    # Later hops belong to multi-step chains ("(3+4)*5"); let the LLM decide the next step
+    if len(messages) < 2 or not isinstance(messages[-2], HumanMessage):
+        return False
+    return _maps_trivially(calls[0]["name"], calls[0]["args"], str(messages[-2].content))
+
+
+async def tool_node(state: ChatState):
+    """Executes any tool calls requested by the LLM."""
+    last_msg = state["messages"][-1]
+    
+    if not hasattr(last_msg, "tool_calls") or not last_msg.tool_calls:
+        # Should not happen in a correctly routed graph, but good for safety
+        return {"messages": [AIMessage(content="No tool call detected")]}
+
+    # Run all requested tool calls concurrently (latency ~ slowest call, not the sum)
+    calls = last_msg.tool_calls
+    results = await asyncio.gather(
+        *[_dispatch(call) for call in calls],
+        return_exceptions=True
+    )
+
+    outputs = []
+    raws = []
+    for call, result in zip(calls, results):
+        if isinstance(result, BaseException):
+            # _dispatch handles tool errors itself; this only catches cancellation-style failures
+            message = ToolMessage(
+                content=f"Tool '{call['name']}' failed: {type(result).__name__}: {result}",
+                tool_call_id=call["id"],
+                name=call["name"]
+            )
+            raw = None
+        else:
+            message, raw = result
+        outputs.append(message)
+        raws.append(raw)
+
+    # A single successful calculator/stock lookup that answers the whole prompt: reply
+    # directly instead of paying another LLM round-trip just to restate the result
+    answer = _terminal_answer(outputs[0].name, raws[0]) if len(outputs) == 1 else None
+    if answer is not None and _can_short_circuit(state["messages"], last_msg):
+        outputs.append(AIMessage(content=answer))
+        return {"messages": outputs, "tools_answered": True}
+
+    return {"messages": outputs, "tools_answered": False}
+
+
+# --- CHECKPOINTER (memory) ---
+CHECKPOINT_DB = "chatbot5.db"
+
+# WAL lets readers proceed alongside the single writer; NORMAL sync is safe under WAL
+SQLITE_PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=268435456;
+"""
+
+# Opened by start_agent(): the async saver needs a running event loop.
+# For multi-worker deployments on several hosts, AsyncPostgresSaver is the better fit.
+checkpoint_conn = None
+checkpointer = None
+
+
+async def open_checkpointer(db_path: str = CHECKPOINT_DB):
+    """Opens the aiosqlite connection and returns an AsyncSqliteSaver, or None if unavailable."""
+    global checkpoint_conn
+    if AsyncSqliteSaver is None:
+        print("Warning: langgraph.checkpoint.sqlite.aio.AsyncSqliteSaver not available. Continuing without persistent checkpointer.")
+        return None
+    try:
+        checkpoint_conn = await aiosqlite.connect(db_path)
+        await checkpoint_conn.executescript(SQLITE_PRAGMAS)
+        return AsyncSqliteSaver(checkpoint_conn)
+    except Exception as e:
+        print(f"Warning: AsyncSqliteSaver initialization failed: {e}")
+        return None
+
+
+# --- 5. GRAPH DEFINITION ---
+def _route_after_chat(state: ChatState):
+    """Routes to the tool node when the LLM requested tool calls, otherwise ends the turn."""
+    tool_calls = getattr(state["messages"][-1], "tool_calls", None)
+    return "tool" if tool_calls else END
+
+
+def _route_after_tool(state: ChatState):
+    """Ends the turn when the tools already answered, otherwise returns to the LLM for synthesis."""
+    return END if state.get("tools_answered") else "chat"
+
+
+def _build_graph() -> StateGraph:
+    graph = StateGraph(ChatState)
+    graph.add_node("chat", chat_node)
+    graph.add_node("tool", tool_node)
+
+    # Entry point
+    graph.add_edge(START, "chat")
+
+    # Conditional Edge: Decide whether to go to the tool or end
+    graph.add_conditional_edges(
+        "chat",
+        _route_after_chat,
+        {
+            "tool": "tool",
+            END: END
+        }
+    )
+
+    # Tool execution loops back to the chat node for synthesis, unless the tools already answered
+    graph.add_conditional_edges(
+        "tool",
+        _route_after_tool,
+        {
+            "chat": "chat",
+            END: END
+        }
+    )
+    return graph
+
+
+@lru_cache(maxsize=1)
+def get_chatbot():
+    """Builds and compiles the agent graph once per process, wired to the current checkpointer.
+
+    Call after start_agent(): before it (or after close_agent()) there is no checkpointer, so
+    the graph would run without memory. start_agent()/close_agent() clear this cache.
+    """
+    graph = _build_graph()
+    if checkpointer is not None:
+        return graph.compile(checkpointer=checkpointer)
+    return graph.compile()
+
+
+# --- 6. LIFECYCLE ---
+async def start_agent(db_path: str = CHECKPOINT_DB):
+    """Opens the checkpointer and returns the compiled graph (call on app startup)."""
+    global checkpointer
+    # Bind eagerly so a missing API key fails startup instead of the first request
+    get_bound_llm()
+    checkpointer = await open_checkpointer(db_path)
+    get_chatbot.cache_clear()
+    return get_chatbot()
+
+
+async def close_agent():
+    """Releases the agent's HTTP clients and checkpoint connection (call on app shutdown)."""
+    global _http, _bound_llm, checkpoint_conn, checkpointer
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+    # aclose_llm() closes the client _bound_llm holds; the next start_agent() rebinds
+    await aclose_llm()
+    _bound_llm = None
+    # Drop the compiled graph along with the connection its checkpointer uses
+    get_chatbot.cache_clear()
+    checkpointer = None
+    if checkpoint_conn is not None:
+        await checkpoint_conn.close()
+        checkpoint_conn = None
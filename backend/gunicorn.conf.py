@@ -0,0 +1,22 @@
+# Gunicorn configuration for the FastAPI backend (see start.sh)
+import os
+
+# --- Workers ---
+# The API is I/O-bound (LLM + tool calls), so run several event loops side by side.
+# UvicornWorker picks up uvloop/httptools automatically when they are installed.
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", (os.cpu_count() or 2) * 2 + 1))
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+
+# LLM round-trips plus tool calls can take a while
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# Do NOT preload the app: each worker imports api.py after fork and opens its own
+# SQLite checkpointer connection in its startup event (WAL handles the concurrent access).
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
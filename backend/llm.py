@@ -0,0 +1,67 @@
+# -------------------------------------------------------
+# SHARED LLM CLIENT
+# -------------------------------------------------------
+# One ChatOpenAI instance per process, used by the agent in graph.py.
+# Its HTTP clients are pooled and speak HTTP/2, so concurrent LLM calls are
+# multiplexed over a few TLS connections instead of opening one per request.
+
+import os
+import httpx
+from dotenv import load_dotenv, dotenv_values
+from langchain_openai import ChatOpenAI
+
+MODEL = "google/gemini-2.0-flash-001"
+API_BASE = "https://openrouter.ai/api/v1"
+TIMEOUT = 20
+
+_LIMITS = httpx.Limits(max_connections=128, max_keepalive_connections=64)
+
+_llm = None
+_async_client = None
+_sync_client = None
+
+
+def _resolve_api_key():
+    """Reads the OpenRouter/OpenAI key from backend/.env first, then the process environment."""
+    load_dotenv()
+    env_values = dotenv_values()
+    api_key = env_values.get("OPENROUTER_API_KEY") or env_values.get("OPENAI_API_KEY")
+    if not api_key:
+        api_key = os.environ.get("OPENROUTER_API_KEY") or os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("No API key found.")
+    return api_key
+
+
+def get_llm() -> ChatOpenAI:
+    """Returns the process-wide ChatOpenAI client (without tools bound), creating it on first use."""
+    global _llm, _async_client, _sync_client
+    if _llm is None:
+        _async_client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(retries=2, http2=True, limits=_LIMITS),
+            timeout=TIMEOUT
+        )
+        _sync_client = httpx.Client(
+            transport=httpx.HTTPTransport(retries=2, http2=True, limits=_LIMITS),
+            timeout=TIMEOUT
+        )
+        _llm = ChatOpenAI(
+            model=MODEL,
+            openai_api_base=API_BASE,
+            openai_api_key=_resolve_api_key(),
+            timeout=TIMEOUT,
+            max_retries=2,
+            http_async_client=_async_client,
+            http_client=_sync_client
+        )
+    return _llm
+
+
+async def aclose_llm():
+    """Closes the pooled HTTP clients (call on app shutdown)."""
+    global _llm, _async_client, _sync_client
+    if _async_client is not None:
+        await _async_client.aclose()
+    if _sync_client is not None:
+        _sync_client.close()
+    _llm = _async_client = _sync_client = None
@@ -1,14 +1,13 @@
-# Save this content into a new file named 'main.py'
+# Alternate entry point: re-exports the FastAPI app from api.py so both
+# `uvicorn main:app` and `uvicorn api:app` serve the same (single) agent graph.
 
-from fastapi import FastAPI
-# ... (all other necessary imports)
-
-# Initialize the FastAPI app
-app = FastAPI(title="LangGraph Chatbot API")
-
-# ... (the rest of the LangGraph and endpoint logic)
+# Works both as `backend.main` (package import) and `main` (run from inside backend/)
+try:
+    from .api import app
+except ImportError:
+    from api import app
 
 # If you include this, Uvicorn will run when you execute the script directly
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
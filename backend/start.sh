@@ -0,0 +1,14 @@
+#!/usr/bin/env sh
+# Production entry point: multi-worker Gunicorn with Uvicorn workers.
+# Usage: ./start.sh   (override worker count with WEB_CONCURRENCY, address with BIND)
+set -e
+cd "$(dirname "$0")"
+
+# One native thread per worker for BLAS/OpenMP/tokenizers pools, so
+# WEB_CONCURRENCY workers don't oversubscribe the CPU cores between them
+export OMP_NUM_THREADS="${OMP_NUM_THREADS:-1}"
+export OPENBLAS_NUM_THREADS="${OPENBLAS_NUM_THREADS:-1}"
+export MKL_NUM_THREADS="${MKL_NUM_THREADS:-1}"
+export TOKENIZERS_PARALLELISM="${TOKENIZERS_PARALLELISM:-false}"
+
+exec gunicorn api:app -c gunicorn.conf.py